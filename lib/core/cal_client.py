@@ -1,17 +1,36 @@
+import asyncio
+import logging
 from collections.abc import Callable
+from types import TracebackType
 from typing import TYPE_CHECKING, Any, cast
 
 import httpx
+import orjson
 import structlog
 from docstring_parser import parse
 from langchain_core.tools import StructuredTool
-from structlog.stdlib import AsyncBoundLogger
 
 from lib.core.langchain_tools import create_pydantic_model_from_function
 
 if TYPE_CHECKING:
     from lib.core.chat_agent import ChatAgent
 
+# Cal.com API version the client is written against
+CAL_API_VERSION = "2024-08-13"
+
+# Timeout of Cal.com requests, applied per request since the HTTP client may
+# be shared with other upstream APIs
+REQUEST_TIMEOUT = httpx.Timeout(10.0, connect=3.0)
+
+# Upper bound on concurrent requests issued by bulk operations
+BULK_CONCURRENCY = 10
+
+# Stdlib logger behind the default structlog logger. Checked before emitting
+# debug events, and info events on paths that bulk operations repeat, so that
+# nothing is built or dispatched when the level is filtered out. Not used for
+# loggers passed to the client, see CalClient._log_enabled.
+_stdlib_logger = logging.getLogger(__name__)
+
 
 class CalClient:
     """
@@ -24,6 +43,7 @@ class CalClient:
         default_event_type_id: int = 1,
         base_url: str = "https://api.cal.com/v2",
         logger: structlog.stdlib.AsyncBoundLogger | None = None,
+        http_client: httpx.AsyncClient | None = None,
     ) -> None:
         """
         Initializes the Cal.com client.
@@ -33,53 +53,146 @@ class CalClient:
             default_event_type_id: The default event type ID for bookings.
             base_url: The base URL for the Cal.com API.
             logger: A structlog logger for structured logging.
+            http_client: A shared HTTP client to send requests with. It is
+                left open by aclose, the caller owns it. A dedicated client
+                is created when not given.
         """
         self.api_key = api_key
         self.default_event_type_id = default_event_type_id
         self.base_url = base_url
         self.logger = logger or structlog.get_logger(__name__)
+        # Stdlib logger whose level guards logging calls. An injected logger
+        # may wrap any logger, so it is not guarded and filters on its own.
+        self._level_logger = None if logger else _stdlib_logger
+
+        # Booking fields that are the same for every booking. Shared by all
+        # payloads, so they must not be mutated.
+        self._booking_skeleton: dict[str, Any] = {
+            "eventTypeId": self.default_event_type_id,
+            "location": {"type": "integration", "integration": "cal-video"},
+            "bookingFieldsResponses": {"notes": "Agentic schedule"},
+        }
+        self._headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "cal-api-version": CAL_API_VERSION,
+            "Content-Type": "application/json",
+        }
+        # Requests carry the full URL and headers, so a client shared with
+        # other APIs can be used as is
+        self._url_prefix = f"{self.base_url.rstrip('/')}/"
+        self._owns_client = http_client is None
+        self._client = http_client or httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(
+                max_keepalive_connections=32,
+                max_connections=100,
+                keepalive_expiry=30,
+            ),
+        )
+
+        # Tool callables with their name, description and parameter docs,
+        # parsed from the docstrings once rather than on every get_tools call
+        self._tool_specs: list[
+            tuple[Callable[..., Any], str, str, dict[str, str | None]]
+        ] = []
+        for func in self.get_tool_callables():
+            docstring = parse(func.__doc__ or "")
+            self._tool_specs.append(
+                (
+                    func,
+                    func.__name__,
+                    docstring.short_description or "",
+                    {
+                        param.arg_name: param.description
+                        for param in docstring.params
+                    },
+                )
+            )
+
+    async def aclose(self) -> None:
+        """
+        Closes the underlying HTTP client and its pooled connections, unless
+        the client was passed in and is owned by the caller.
+        """
+        if self._owns_client:
+            await self._client.aclose()
+
+    def _log_enabled(self, level: int) -> bool:
+        """
+        Checks whether events at the given level should be sent to the logger.
+        """
+        if self._level_logger is None:
+            return True
+        return self._level_logger.isEnabledFor(level)
+
+    async def __aenter__(self) -> "CalClient":
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        await self.aclose()
 
     async def _request(
         self,
         method: str,
         endpoint: str,
-        logger: AsyncBoundLogger,
         **kwargs: Any,
-    ) -> httpx.Response | dict[str, Any]:
+    ) -> dict[str, Any]:
         """
         Makes an authenticated request to the Cal.com API.
+
+        The response body is decoded once and returned as is. Failed requests
+        are guaranteed to carry an "error" key, which callers check for. Error
+        bodies that are not a JSON object are returned as text under it.
         """
-        url = f"{self.base_url}/{endpoint}"
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "cal-api-version": "2024-08-13",
-            "Content-Type": "application/json",
-        }
+        debug_enabled = self._log_enabled(logging.DEBUG)
+        if debug_enabled:
+            await self.logger.debug(
+                "Making Cal.com API request",
+                method=method,
+                endpoint=endpoint,
+                params=kwargs.get("params"),
+            )
 
-        await logger.info(
-            "Making Cal.com API request",
-            method=method,
-            url=url,
-            params=kwargs.get("params"),
+        response = await self._client.request(
+            method,
+            self._url_prefix + endpoint,
+            headers=self._headers,
+            timeout=REQUEST_TIMEOUT,
+            **kwargs,
         )
-
-        async with httpx.AsyncClient() as client:
-            response = await client.request(
-                method, url, headers=headers, **kwargs
-            )
-            await logger.info(
+        if debug_enabled:
+            await self.logger.debug(
                 "Received Cal.com API response",
                 status_code=response.status_code,
+                http_version=response.http_version,
             )
-            if response.status_code != 200:
-                await logger.error(
-                    "Cal.com API request failed",
-                    status_code=response.status_code,
-                    response_text=response.text,
-                )
-                error_data = response.json()
-                return cast(dict[str, Any], error_data)
-            return response
+        if response.is_success:
+            return cast(dict[str, Any], orjson.loads(response.content))
+
+        await self.logger.error(
+            "Cal.com API request failed",
+            status_code=response.status_code,
+            response_text=response.text,
+        )
+        # Error bodies are not always JSON objects, e.g. a proxy error page
+        try:
+            data = orjson.loads(response.content)
+        except orjson.JSONDecodeError:
+            data = None
+        if not isinstance(data, dict):
+            return {
+                "error": {
+                    "status_code": response.status_code,
+                    "body": response.text,
+                }
+            }
+        data.setdefault("error", {"status_code": response.status_code})
+        return data
 
     async def create_booking(
         self,
@@ -87,7 +200,6 @@ class CalClient:
         attendee_name: str,
         attendee_email: str,
         attendee_timezone: str,
-        logger: AsyncBoundLogger,
         guests: list[str] | None = None,
         metadata: dict[str, Any] | None = None,
         length_in_minutes: int | None = None,
@@ -100,7 +212,6 @@ class CalClient:
             attendee_name: The name of the person booking the event.
             attendee_email: The email of the person booking the event.
             attendee_timezone: The IANA time zone of the attendee.
-            logger: The request-specific logger.
             guests: An optional list of guest emails.
             metadata: Optional metadata for the booking.
             length_in_minutes: Optional duration for variable length events.
@@ -110,16 +221,14 @@ class CalClient:
         """
         endpoint = "bookings"
         payload: dict[str, Any] = {
+            **self._booking_skeleton,
             "start": start,
-            "eventTypeId": self.default_event_type_id,
             "attendee": {
                 "language": "en",
                 "name": attendee_name,
                 "email": attendee_email,
                 "timeZone": attendee_timezone,
             },
-            "location": {"type": "integration", "integration": "cal-video"},
-            "bookingFieldsResponses": {"notes": "Agentic schedule"},
         }
 
         if guests:
@@ -129,15 +238,12 @@ class CalClient:
         if length_in_minutes:
             payload["lengthInMinutes"] = length_in_minutes
 
-        await logger.info("Creating Cal.com booking", payload=payload)
-        response = await self._request(
-            "POST", endpoint, logger=logger, json=payload
-        )
-        if isinstance(response, dict):
-            return response
+        await self.logger.info("Creating Cal.com booking", start=start)
+        json_response = await self._request("POST", endpoint, json=payload)
+        if "error" in json_response:
+            return json_response
 
-        json_response = cast(dict[str, Any], response.json())
-        await logger.info(
+        await self.logger.info(
             "Successfully created booking",
             booking_uid=json_response.get("data", {}).get("uid"),
         )
@@ -145,7 +251,6 @@ class CalClient:
 
     async def get_bookings(
         self,
-        logger: AsyncBoundLogger,
         attendee_email: str | None = None,
         after_start: str | None = None,
         before_end: str | None = None,
@@ -157,7 +262,6 @@ class CalClient:
         Fetches a list of bookings, with optional filters and pagination.
 
         Args:
-            logger: The request-specific logger.
             attendee_email: Filter bookings by the attendee's email address.
             after_start: Filter for bookings starting after this ISO 8601 date.
             before_end: Filter for bookings ending before this ISO 8601 date.
@@ -183,43 +287,95 @@ class CalClient:
             # Default to showing upcoming and unconfirmed bookings
             params["status"] = ",".join(["upcoming", "unconfirmed"])
 
-        await logger.info("Fetching Cal.com bookings", params=params)
-        response = await self._request(
-            "GET", endpoint, logger=logger, params=params
-        )
-        if isinstance(response, dict):
-            return response
-
-        json_response = cast(dict[str, Any], response.json())
-        await logger.info(
-            "Successfully fetched bookings",
-            count=len(json_response.get("data", [])),
-        )
+        info_enabled = self._log_enabled(logging.INFO)
+        if info_enabled:
+            await self.logger.info("Fetching Cal.com bookings")
+        json_response = await self._request("GET", endpoint, params=params)
+        if "error" in json_response:
+            return json_response
+
+        if info_enabled:
+            await self.logger.info(
+                "Successfully fetched bookings",
+                count=len(json_response.get("data", [])),
+            )
         return json_response
 
-    async def get_booking(
-        self, booking_uid: str, logger: AsyncBoundLogger
+    async def get_all_bookings(
+        self,
+        attendee_email: str | None = None,
+        after_start: str | None = None,
+        before_end: str | None = None,
+        status: list[str] | None = None,
+        page_size: int = 100,
     ) -> dict[str, Any]:
+        """
+        Fetches every booking matching the filters across all pages.
+
+        The first page is fetched to learn the total count, the remaining
+        pages are then fetched concurrently, with at most BULK_CONCURRENCY
+        requests in flight.
+
+        Args:
+            attendee_email: Filter bookings by the attendee's email address.
+            after_start: Filter for bookings starting after this ISO 8601 date.
+            before_end: Filter for bookings ending before this ISO 8601 date.
+            status: Filter bookings by status (e.g., ['accepted', 'pending']).
+            page_size: The number of items to request per page.
+
+        Returns:
+            A dictionary containing all bookings, or the first error response.
+        """
+        filters: dict[str, Any] = {
+            "attendee_email": attendee_email,
+            "after_start": after_start,
+            "before_end": before_end,
+            "status": status,
+        }
+        first_page = await self.get_bookings(take=page_size, **filters)
+        if "error" in first_page:
+            return first_page
+
+        bookings = list(first_page.get("data", []))
+        total = first_page.get("pagination", {}).get("totalItems", 0)
+        num_pages = -(-total // page_size)
+        semaphore = asyncio.Semaphore(BULK_CONCURRENCY)
+
+        async def fetch_page(page: int) -> dict[str, Any]:
+            async with semaphore:
+                return await self.get_bookings(
+                    take=page_size, skip=page * page_size, **filters
+                )
+
+        remaining_pages = await asyncio.gather(
+            *(fetch_page(page) for page in range(1, num_pages))
+        )
+        for page_response in remaining_pages:
+            if "error" in page_response:
+                return page_response
+            bookings.extend(page_response.get("data", []))
+
+        return {"status": "success", "data": bookings}
+
+    async def get_booking(self, booking_uid: str) -> dict[str, Any]:
         """
         Fetches a single booking by its UID.
 
         Args:
             booking_uid: The unique identifier (UID) of the booking.
-            logger: The request-specific logger.
 
         Returns:
             A dictionary containing the booking's details.
         """
         endpoint = f"bookings/{booking_uid}"
-        await logger.info(
+        await self.logger.info(
             "Fetching Cal.com booking by UID", booking_uid=booking_uid
         )
-        response = await self._request("GET", endpoint, logger=logger)
-        if isinstance(response, dict):
-            return response
+        json_response = await self._request("GET", endpoint)
+        if "error" in json_response:
+            return json_response
 
-        json_response = cast(dict[str, Any], response.json())
-        await logger.info(
+        await self.logger.info(
             "Successfully fetched single booking", booking_uid=booking_uid
         )
         return json_response
@@ -227,7 +383,6 @@ class CalClient:
     async def cancel_booking(
         self,
         booking_uid: str,
-        logger: AsyncBoundLogger,
         reason: str | None = None,
     ) -> dict[str, Any]:
         """
@@ -235,7 +390,6 @@ class CalClient:
 
         Args:
             booking_uid: The unique identifier (UID) of the booking to cancel.
-            logger: The request-specific logger.
             reason: An optional reason for the cancellation.
 
         Returns:
@@ -246,47 +400,47 @@ class CalClient:
         if reason:
             payload["cancellationReason"] = reason
 
-        await logger.info(
-            "Cancelling Cal.com booking",
-            booking_uid=booking_uid,
-            reason=reason,
-        )
-        response = await self._request(
-            "POST", endpoint, logger=logger, json=payload
-        )
-        if isinstance(response, dict):
-            return response
+        info_enabled = self._log_enabled(logging.INFO)
+        if info_enabled:
+            await self.logger.info(
+                "Cancelling Cal.com booking",
+                booking_uid=booking_uid,
+                reason=reason,
+            )
+        json_response = await self._request("POST", endpoint, json=payload)
+        if "error" in json_response:
+            return json_response
 
-        json_response = cast(dict[str, Any], response.json())
-        await logger.info(
-            "Successfully cancelled booking", booking_uid=booking_uid
-        )
+        if info_enabled:
+            await self.logger.info(
+                "Successfully cancelled booking", booking_uid=booking_uid
+            )
         return json_response
 
     async def cancel_all_bookings(
-        self, logger: AsyncBoundLogger, reason: str | None = None
+        self, reason: str | None = None
     ) -> dict[str, Any]:
         """
         Fetches and cancels all active (accepted or pending) bookings.
 
-        This is a client-side convenience method that iterates through all
-        active bookings and cancels them one by one.
+        This is a client-side convenience method that cancels all active
+        bookings concurrently, with at most BULK_CONCURRENCY requests in
+        flight.
 
         Args:
-            logger: The request-specific logger.
             reason: An optional reason for the cancellation.
 
         Returns:
             A dictionary summarizing the operation, including a success count
             and a list of any failures.
         """
-        await logger.info("Starting to cancel all active bookings.")
-        active_bookings_response = await self.get_bookings(
-            logger=logger, status=["upcoming", "unconfirmed"]
+        await self.logger.info("Starting to cancel all active bookings.")
+        active_bookings_response = await self.get_all_bookings(
+            status=["upcoming", "unconfirmed"]
         )
 
         if "error" in active_bookings_response:
-            await logger.error(
+            await self.logger.error(
                 "Failed to fetch active bookings to cancel.",
                 error=active_bookings_response["error"],
             )
@@ -297,46 +451,61 @@ class CalClient:
 
         bookings_to_cancel = active_bookings_response.get("data", [])
         if not bookings_to_cancel:
-            await logger.info("No active bookings found to cancel.")
+            await self.logger.info("No active bookings found to cancel.")
             return {"cancelled_count": 0, "failures": []}
 
+        semaphore = asyncio.Semaphore(BULK_CONCURRENCY)
+
+        async def cancel(booking_uid: str) -> dict[str, Any]:
+            async with semaphore:
+                if self._log_enabled(logging.DEBUG):
+                    await self.logger.debug(
+                        "Cancelling booking as part of bulk operation",
+                        booking_uid=booking_uid,
+                    )
+                return await self.cancel_booking(
+                    booking_uid=booking_uid, reason=reason
+                )
+
+        booking_uids = [
+            booking["uid"]
+            for booking in bookings_to_cancel
+            if booking.get("uid")
+        ]
+        results = await asyncio.gather(
+            *(cancel(booking_uid) for booking_uid in booking_uids),
+            return_exceptions=True,
+        )
+
         success_count = 0
         failures = []
 
-        for booking in bookings_to_cancel:
-            booking_uid = booking.get("uid")
-            if not booking_uid:
+        for booking_uid, cancellation_result in zip(
+            booking_uids, results, strict=True
+        ):
+            if isinstance(cancellation_result, BaseException):
+                error: Any = str(cancellation_result)
+            elif "error" in cancellation_result:
+                error = cancellation_result["error"]
+            else:
+                success_count += 1
                 continue
 
-            await logger.info(
-                "Cancelling booking as part of bulk operation",
-                booking_uid=booking_uid,
-            )
-
-            cancellation_result = await self.cancel_booking(
-                booking_uid=booking_uid, reason=reason, logger=logger
+            failure_detail = {"booking_uid": booking_uid, "error": error}
+            failures.append(failure_detail)
+            await self.logger.error(
+                "Failed during bulk cancellation.", **failure_detail
             )
-            if "error" in cancellation_result:
-                failure_detail = {
-                    "booking_uid": booking_uid,
-                    "error": cancellation_result["error"],
-                }
-                failures.append(failure_detail)
-                await logger.error(
-                    "Failed during bulk cancellation.", **failure_detail
-                )
-            else:
-                success_count += 1
 
         summary = {"cancelled_count": success_count, "failures": failures}
-        await logger.info("Finished bulk cancellation.", **summary)
+        if self._log_enabled(logging.INFO):
+            await self.logger.info("Finished bulk cancellation.", **summary)
         return summary
 
     async def reschedule_booking(
         self,
         booking_uid: str,
         start: str,
-        logger: AsyncBoundLogger,
         reason: str | None = None,
     ) -> dict[str, Any]:
         """
@@ -345,7 +514,6 @@ class CalClient:
         Args:
             booking_uid: The unique identifier of the booking to reschedule.
             start: The new start time in ISO 8601 format (UTC).
-            logger: The request-specific logger.
             reason: An optional reason for the reschedule.
 
         Returns:
@@ -356,19 +524,16 @@ class CalClient:
         if reason:
             payload["reschedulingReason"] = reason
 
-        await logger.info(
+        await self.logger.info(
             "Rescheduling Cal.com booking",
             booking_uid=booking_uid,
-            payload=payload,
-        )
-        response = await self._request(
-            "POST", endpoint, logger=logger, json=payload
+            start=start,
         )
-        if isinstance(response, dict):
-            return response
+        json_response = await self._request("POST", endpoint, json=payload)
+        if "error" in json_response:
+            return json_response
 
-        json_response = cast(dict[str, Any], response.json())
-        await logger.info(
+        await self.logger.info(
             "Successfully rescheduled booking", booking_uid=booking_uid
         )
         return json_response
@@ -385,36 +550,29 @@ class CalClient:
             self.cancel_all_bookings,
         ]
 
-    def get_tools(
-        self, agent: "ChatAgent", logger: AsyncBoundLogger
-    ) -> list[StructuredTool]:
+    def get_tools(self, agent: "ChatAgent") -> list[StructuredTool]:
         """
         Builds and returns a list of LangChain StructuredTools from this
         client.
         """
         tools = []
-        for func in self.get_tool_callables():
-            docstring = parse(func.__doc__ or "")
-            description = docstring.short_description or ""
-            tool_name = func.__name__
+        for func, tool_name, description, doc_params in self._tool_specs:
             model_name = f"{tool_name.title().replace('_', '')}Args"
 
             def create_tool_wrapper(
-                agent: "ChatAgent", tool_name: str, logger: AsyncBoundLogger
+                agent: "ChatAgent", tool_name: str
             ) -> Callable[..., Any]:
                 async def tool_wrapper(**kwargs: Any) -> str:
-                    return await agent._run_tool(
-                        tool_name=tool_name, logger=logger, **kwargs
-                    )
+                    return await agent._run_tool(tool_name=tool_name, **kwargs)
 
                 return tool_wrapper
 
             tool = StructuredTool(
                 name=tool_name,
-                coroutine=create_tool_wrapper(agent, tool_name, logger),
+                coroutine=create_tool_wrapper(agent, tool_name),
                 description=description,
                 args_schema=create_pydantic_model_from_function(
-                    func, model_name=model_name
+                    func, model_name=model_name, doc_params=doc_params
                 ),
             )
             tools.append(tool)
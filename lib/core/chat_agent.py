@@ -1,7 +1,10 @@
-import json
+import re
+from collections import OrderedDict, deque
+from contextvars import ContextVar
 from datetime import datetime, timedelta, timezone
 from typing import Any, cast
 
+import orjson
 from langchain.agents import AgentExecutor, create_tool_calling_agent
 from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
@@ -13,6 +16,65 @@ from structlog.stdlib import AsyncBoundLogger
 from lib.core.cal_client import CalClient
 from lib.core.openai_client import OpenAIClient
 
+# Logger of the request currently being handled. The agent executor and its
+# tools are shared across requests, so tool calls resolve the logger from here.
+# Also set by the request context middleware for the error logger.
+request_logger: ContextVar[AsyncBoundLogger] = ContextVar("request_logger")
+
+# Number of sessions kept in memory, least recently used ones are evicted
+MAX_SESSIONS = 10_000
+
+# Number of messages of history kept per session
+MAX_HISTORY_MESSAGES = 40
+
+# Requests to list upcoming meetings without any further qualifiers. These are
+# answered straight from Cal.com, anything else goes through the agent.
+_LIST_MEETINGS_PATTERN = re.compile(
+    r"\s*(?:list|show|view)\s+(?:(?:me|my|all|upcoming)\s+)*"
+    r"(?:meetings|bookings|events)\s*[.!?]?\s*",
+    re.IGNORECASE,
+)
+
+# The time-dependent fields are filled in per invocation, so the template is
+# parsed once and shared by every agent executor
+_SYSTEM_TEMPLATE = (
+    "You are a world class personal assistant for scheduling meetings. "
+    "You always treat user with respect and kindness. "
+    "If the user requests you to do anything other than managing "
+    "meetings, respectfully decline. "
+    "Always keep your answers concise at any cost.\n"
+    "Users can - View all meetings, schedule a new meeting, "
+    "cancel one or all meetings, reschedule a meeting.\n"
+    "Current UTC time: {current_time}.\n"
+    "Today's date: {current_date}\n"
+    "Tomorrow's date: {tomorrow_date}\n"
+    "You must schedule meetings for a future time. "
+    "When the user says 'tomorrow', use the tomorrow date above. "
+    "Always convert times to UTC format for API calls."
+)
+_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        ("system", _SYSTEM_TEMPLATE),
+        MessagesPlaceholder(variable_name="chat_history"),
+        ("human", "{input}"),
+        MessagesPlaceholder(variable_name="agent_scratchpad"),
+    ]
+)
+
+_ONE_DAY = timedelta(days=1)
+
+
+def _time_context() -> dict[str, str]:
+    """
+    Returns the time-dependent variables of the system prompt.
+    """
+    now = datetime.now(timezone.utc)
+    return {
+        "current_time": now.isoformat(),
+        "current_date": now.strftime("%Y-%m-%d"),
+        "tomorrow_date": (now + _ONE_DAY).strftime("%Y-%m-%d"),
+    }
+
 
 class ChatAgent:
     """
@@ -27,80 +89,115 @@ class ChatAgent:
     ) -> None:
         self.openai_client = openai_client
         self.cal_client = cal_client
-        self.sessions: dict[str, list[BaseMessage]] = {}
+        self.sessions: OrderedDict[str, deque[BaseMessage]] = OrderedDict()
+        self._executor: AgentExecutor | None = None
 
         self.llm = ChatOpenAI(
             model="gpt-4-turbo",
             temperature=0,
             api_key=SecretStr(self.openai_client.client.api_key),
             base_url=str(self.openai_client.client.base_url),
+            http_async_client=self.openai_client.http_client,
         )
 
-    def _create_tools(self, logger: AsyncBoundLogger) -> list[StructuredTool]:
+    def _create_tools(self) -> list[StructuredTool]:
         """
         Dynamically creates LangChain tools by introspecting the client methods
         """
-        return self.cal_client.get_tools(agent=self, logger=logger)
-
-    def _create_agent_executor(self, logger: AsyncBoundLogger) -> AgentExecutor:
-        tools = self._create_tools(logger)
-        current_time = datetime.now(timezone.utc)
-        current_date = current_time.strftime("%Y-%m-%d")
-        tomorrow_date = (current_time + timedelta(days=1)).strftime("%Y-%m-%d")
-        system_message = (
-            "You are a world class personal assistant for scheduling meetings. "
-            "You always treat user with respect and kindness. "
-            "If the user requests you to do anything other than managing "
-            "meetings, respectfully decline. "
-            "Always keep your answers concise at any cost.\n"
-            "Users can - View all meetings, schedule a new meeting, "
-            "cancel one or all meetings, reschedule a meeting.\n"
-            f"Current UTC time: {current_time.isoformat()}.\n"
-            f"Today's date: {current_date}\n"
-            f"Tomorrow's date: {tomorrow_date}\n"
-            "You must schedule meetings for a future time. "
-            "When the user says 'tomorrow', use the tomorrow date above. "
-            "Always convert times to UTC format for API calls."
-        )
-        prompt = ChatPromptTemplate.from_messages(
-            [
-                ("system", system_message),
-                MessagesPlaceholder(variable_name="chat_history"),
-                ("human", "{input}"),
-                MessagesPlaceholder(variable_name="agent_scratchpad"),
-            ]
-        )
-        agent = create_tool_calling_agent(self.llm, tools, prompt)
-        return AgentExecutor(agent=agent, tools=tools, verbose=True)
+        return self.cal_client.get_tools(agent=self)
+
+    def _create_agent_executor(self) -> AgentExecutor:
+        """
+        Returns the agent executor, building it on first use.
+
+        The executor does not depend on the request, the time-dependent parts
+        of the system message are passed in as prompt variables per invocation.
+        """
+        if self._executor is not None:
+            return self._executor
+
+        tools = self._create_tools()
+        agent = create_tool_calling_agent(self.llm, tools, _PROMPT)
+        self._executor = AgentExecutor(agent=agent, tools=tools, verbose=True)
+        return self._executor
 
     async def open_session(
         self, session_id: str, logger: AsyncBoundLogger
-    ) -> list[BaseMessage]:
+    ) -> deque[BaseMessage]:
         """
         Retrieves an existing session history or creates a new one.
+        The history keeps only the last MAX_HISTORY_MESSAGES messages.
+        Evicts the least recently used session once MAX_SESSIONS is exceeded.
         """
-        if session_id not in self.sessions:
-            await logger.info("Creating new session", session_id=session_id)
-            self.sessions[session_id] = []
-        return self.sessions[session_id]
+        history = self.sessions.get(session_id)
+        if history is not None:
+            self.sessions.move_to_end(session_id)
+            return history
+
+        await logger.info("Creating new session", session_id=session_id)
+        history = self.sessions[session_id] = deque(maxlen=MAX_HISTORY_MESSAGES)
+        if len(self.sessions) > MAX_SESSIONS:
+            evicted_session_id, _ = self.sessions.popitem(last=False)
+            await logger.info(
+                "Evicted least recently used session",
+                session_id=evicted_session_id,
+            )
+        return history
 
     async def get_response(
         self, session_id: str, message: str, logger: AsyncBoundLogger
     ) -> str:
         history = await self.open_session(session_id, logger)
-        agent_executor = self._create_agent_executor(logger)
-        await logger.info(
-            "Invoking agent", user_message=message, session_id=session_id
-        )
-        response = await agent_executor.ainvoke(
-            {"input": message, "chat_history": history}
-        )
-        output = cast(str, response.get("output", "Not sure how to help."))
+        output = await self._answer_directly(message, logger)
+        if output is None:
+            agent_executor = self._create_agent_executor()
+            await logger.info(
+                "Invoking agent", user_message=message, session_id=session_id
+            )
+            request_logger.set(logger)
+            response = await agent_executor.ainvoke(
+                {
+                    "input": message,
+                    "chat_history": list(history),
+                    **_time_context(),
+                }
+            )
+            output = cast(str, response.get("output", "Not sure how to help."))
 
         history.append(HumanMessage(content=message))
         history.append(AIMessage(content=output))
         return output
 
+    async def _answer_directly(
+        self, message: str, logger: AsyncBoundLogger
+    ) -> str | None:
+        """
+        Answers unambiguous requests without a round-trip to the LLM.
+
+        Returns:
+            The response text, or None if the message needs the agent.
+        """
+        if not _LIST_MEETINGS_PATTERN.fullmatch(message):
+            return None
+
+        await logger.info("Listing meetings without invoking agent")
+        result = await self.cal_client.get_all_bookings()
+        if "error" in result:
+            # Let the agent explain the failure to the user
+            return None
+
+        bookings = result.get("data", [])
+        if not bookings:
+            return "You have no upcoming meetings."
+
+        lines = ["Your upcoming meetings:"]
+        for booking in bookings:
+            lines.append(
+                f"- {booking.get('title') or 'Untitled meeting'}: "
+                f"{booking.get('start')} to {booking.get('end')}"
+            )
+        return "\n".join(lines)
+
     async def close_session(
         self, session_id: str, logger: AsyncBoundLogger
     ) -> None:
@@ -108,15 +205,14 @@ class ChatAgent:
             del self.sessions[session_id]
             await logger.info("Closed session", session_id=session_id)
 
-    async def _run_tool(
-        self, tool_name: str, logger: AsyncBoundLogger, **kwargs: Any
-    ) -> str:
+    async def _run_tool(self, tool_name: str, **kwargs: Any) -> str:
         """
         Single dispatch method to run any tool by its name.
         """
+        logger = request_logger.get()
         await logger.debug(
             "Agent dispatching tool", tool_name=tool_name, args=kwargs
         )
         cal_method = getattr(self.cal_client, tool_name)
-        result = await cal_method(logger=logger, **kwargs)
-        return json.dumps(result, indent=2)
+        result = await cal_method(**kwargs)
+        return orjson.dumps(result, option=orjson.OPT_INDENT_2).decode()
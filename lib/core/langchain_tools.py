@@ -5,10 +5,16 @@ from typing import Any, cast
 from docstring_parser import parse
 from pydantic import BaseModel, Field, create_model
 
+# Generated models keyed by (function, model name). Bound methods are keyed by
+# their underlying function, since the schema does not depend on the instance
+# and the cache must not keep clients alive. Each schema is built only once.
+_model_cache: dict[tuple[Callable[..., Any], str], type[BaseModel]] = {}
+
 
 def create_pydantic_model_from_function(
     func: Callable[..., Any],
     model_name: str,
+    doc_params: dict[str, str | None] | None = None,
 ) -> type[BaseModel]:
     """
     Dynamically creates a Pydantic model from a function's signature,
@@ -17,16 +23,24 @@ def create_pydantic_model_from_function(
     Args:
         func: The function to introspect.
         model_name: The desired name for the created Pydantic model.
+        doc_params: Parameter descriptions already parsed from the docstring.
+            The docstring is parsed when not given.
 
     Returns:
         A Pydantic model class representing the function's arguments.
     """
+    cache_key = (getattr(func, "__func__", func), model_name)
+    cached_model = _model_cache.get(cache_key)
+    if cached_model is not None:
+        return cached_model
+
     fields: dict[str, Any] = {}
     signature = inspect.signature(func)
-    docstring = parse(func.__doc__ or "")
-    doc_params = {
-        param.arg_name: param.description for param in docstring.params
-    }
+    if doc_params is None:
+        docstring = parse(func.__doc__ or "")
+        doc_params = {
+            param.arg_name: param.description for param in docstring.params
+        }
 
     for param_name, parameter in signature.parameters.items():
         if param_name in ("self", "cls", "logger"):
@@ -47,5 +61,9 @@ def create_pydantic_model_from_function(
                 Field(default=default_value, description=description),
             )
 
-    dynamic_model = create_model(model_name, **fields)
-    return cast(type[BaseModel], dynamic_model)
+    # Built eagerly on purpose: with defer_build=True LangChain derives the
+    # tool call schema from the not yet populated fields and sends the LLM
+    # tools without parameters. The cache above keeps this a one-off cost.
+    dynamic_model = cast(type[BaseModel], create_model(model_name, **fields))
+    _model_cache[cache_key] = dynamic_model
+    return dynamic_model
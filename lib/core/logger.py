@@ -1,37 +1,208 @@
 import logging
 import os
+import queue
+import time
+import traceback
 from logging import handlers
+from typing import Any
 
+import orjson
 import structlog
 
 LOG_ROTATE_WHEN = os.getenv(key="LOG_ROTATE_WHEN", default="W6")
 LOG_ROTATE_BACKUP = int(os.getenv(key="LOG_ROTATE_BACKUP", default="4"))
 
+# Pending records written together by the batching file handler
+LOG_BATCH_RECORDS = 256
+LOG_FLUSH_INTERVAL = 0.05
 
-def initialize_logger(logger_name: str) -> None:
+
+class BatchingFileHandler(handlers.TimedRotatingFileHandler):
+    """
+    Rotating file handler that writes records in batches.
+
+    Formatted records are buffered and written with a single write call once
+    max_records are pending or flush_interval seconds have passed since the
+    last write, instead of one write per record.
+
+    Args:
+        max_records: Number of pending records that triggers a write
+        flush_interval: Seconds after which pending records are written
+    """
+
+    def __init__(
+        self,
+        *args: Any,
+        max_records: int = LOG_BATCH_RECORDS,
+        flush_interval: float = LOG_FLUSH_INTERVAL,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.max_records = max_records
+        self.flush_interval = flush_interval
+        self._buffer: list[str] = []
+        self._last_write = time.monotonic()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            # Pending records belong to the file before the rollover
+            if self.shouldRollover(record):
+                self.flush()
+                self.doRollover()
+            self._buffer.append(self.format(record) + self.terminator)
+
+            if (
+                len(self._buffer) >= self.max_records
+                or time.monotonic() - self._last_write >= self.flush_interval
+            ):
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self) -> None:
+        with self.lock:  # type: ignore[union-attr]
+            try:
+                if self._buffer:
+                    if self.stream is None:
+                        self.stream = self._open()
+                    self.stream.write("".join(self._buffer))
+                super().flush()
+            except Exception:
+                # Like a failed emit, report the error and drop the batch
+                # rather than retrying it on every later record
+                self.handleError(
+                    logging.makeLogRecord(
+                        {
+                            "msg": "Failed to write %d log records",
+                            "args": (len(self._buffer),),
+                        }
+                    )
+                )
+            finally:
+                self._buffer.clear()
+                self._last_write = time.monotonic()
+
+
+class FlushingQueueListener(handlers.QueueListener):
+    """
+    Queue listener that flushes its handlers whenever the queue goes idle,
+    so batched records are not held back while no new records arrive.
+    Stopping the listener detaches the root QueueHandler feeding its queue
+    and closes its handlers, writing out any pending records.
+
+    Args:
+        flush_interval: Seconds without records after which handlers flush
+    """
+
+    def __init__(
+        self,
+        log_queue: queue.SimpleQueue[logging.LogRecord],
+        *handlers: logging.Handler,
+        respect_handler_level: bool = False,
+        flush_interval: float = LOG_FLUSH_INTERVAL,
+    ) -> None:
+        super().__init__(
+            log_queue, *handlers, respect_handler_level=respect_handler_level
+        )
+        self.log_queue = log_queue
+        self.flush_interval = flush_interval
+
+    def dequeue(self, block: bool) -> logging.LogRecord:
+        if not block:
+            return self.log_queue.get(block=False)
+
+        while True:
+            try:
+                return self.log_queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self.flush()
+
+    def flush(self) -> None:
+        for handler in self.handlers:
+            # A failing handler must not end the listener thread
+            try:
+                handler.flush()
+            except Exception:
+                if logging.raiseExceptions:
+                    traceback.print_exc()
+
+    def stop(self) -> None:
+        # Detach the handler feeding the queue first, so nothing is queued
+        # once the listener no longer drains it
+        root_logger = logging.getLogger()
+        for handler in root_logger.handlers[:]:
+            if (
+                isinstance(handler, handlers.QueueHandler)
+                and handler.queue is self.log_queue
+            ):
+                root_logger.removeHandler(handler)
+                handler.close()
+
+        super().stop()
+        for handler in self.handlers:
+            handler.close()
+
+
+def _dumps(value: Any, **kwargs: Any) -> str:
+    """
+    Serialize a log event to JSON with orjson
+
+    Args:
+        value: Event dict to serialize
+        kwargs: JSONRenderer keyword arguments, only default is used
+
+    Returns:
+        str: JSON encoded event
+    """
+    return orjson.dumps(
+        value, default=kwargs.get("default"), option=orjson.OPT_NON_STR_KEYS
+    ).decode()
+
+
+def initialize_logger(logger_name: str) -> FlushingQueueListener:
     """
     Initialize logger for the given logger name
 
+    Records are handed to a queue by the logging call and written to the log
+    file in batches by a background listener thread, so the event loop never
+    blocks on file I/O. The caller is responsible for stopping the returned
+    listener, which also writes out any pending records.
+
     Args:
         logger_name: Name of the logger
 
     Returns:
-        None
+        FlushingQueueListener: Started listener writing queued records
     """
     # Configure standard logger to log to a rotating file
     log_file_path = f"logs/{logger_name}.log"
-    file_handler = handlers.TimedRotatingFileHandler(
+    file_handler = BatchingFileHandler(
         filename=log_file_path,
         when=LOG_ROTATE_WHEN,
         backupCount=LOG_ROTATE_BACKUP,
         encoding="utf-8",
     )
     file_handler.setLevel(logging.INFO)
+    file_handler.setFormatter(logging.Formatter("%(message)s"))
+
+    # Route all records through a queue drained by a listener thread. An
+    # unbounded SimpleQueue never blocks or fails the put on the event loop.
+    # This relies on the listener draining the queue for as long as the
+    # handler is attached. force replaces the handler of a previous call,
+    # stopping the listener detaches this one, and write errors are reported
+    # by the handlers rather than ending the listener thread.
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    queue_handler = handlers.QueueHandler(log_queue)
     logging.basicConfig(
         format="%(message)s",
         level=logging.INFO,
-        handlers=[file_handler],
+        handlers=[queue_handler],
+        force=True,
     )
+    listener = FlushingQueueListener(
+        log_queue, file_handler, respect_handler_level=True
+    )
+    listener.start()
 
     # Configure structlog
     structlog.configure(
@@ -44,9 +215,11 @@ def initialize_logger(logger_name: str) -> None:
             structlog.processors.StackInfoRenderer(),
             structlog.processors.ExceptionPrettyPrinter(),
             structlog.processors.UnicodeDecoder(),
-            structlog.processors.JSONRenderer(),
+            structlog.processors.JSONRenderer(serializer=_dumps),
         ],
         wrapper_class=structlog.stdlib.AsyncBoundLogger,
         logger_factory=structlog.stdlib.LoggerFactory(),
         cache_logger_on_first_use=True,
     )
+
+    return listener
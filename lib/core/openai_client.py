@@ -1,3 +1,4 @@
+import httpx
 import structlog
 from openai import AsyncOpenAI
 
@@ -12,6 +13,7 @@ class OpenAIClient:
         base_url: str,
         api_key: str,
         logger: structlog.stdlib.AsyncBoundLogger | None = None,
+        http_client: httpx.AsyncClient | None = None,
     ) -> None:
         """
         Initializes the OpenAI client.
@@ -19,8 +21,12 @@ class OpenAIClient:
         Args:
             api_key: The OpenAI API key.
             logger: A structlog logger for structured logging.
+            http_client: A shared HTTP client to send requests with.
         """
-        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url)
+        self.http_client = http_client
+        self.client = AsyncOpenAI(
+            api_key=api_key, base_url=base_url, http_client=http_client
+        )
         self.logger = logger or structlog.get_logger(__name__)
 
     async def get_completion(
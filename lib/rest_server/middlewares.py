@@ -1,48 +1,219 @@
-import uuid
+import secrets
+from collections.abc import Sequence
 
 import structlog
-from fastapi import Request, Response
-from starlette.middleware.base import RequestResponseEndpoint
+from starlette.datastructures import URL
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from lib.core.chat_agent import request_logger
 from lib.rest_server.context import Context
 
+HeaderList = list[tuple[bytes, bytes]]
 
-async def create_context(
-    request: Request,
-    call_next: RequestResponseEndpoint,
-) -> Response:
+# CORS headers other than the allowed origin, the same for every response
+_PREFLIGHT_HEADERS = [
+    (b"access-control-allow-methods", b"*"),
+    (b"access-control-allow-headers", b"*"),
+    (b"access-control-max-age", b"600"),
+]
+
+# Internal server error response, built once. Shared by all failed requests,
+# so it must not be mutated.
+_INTERNAL_ERROR_RESPONSE = Response(
+    b'{"error":"Internal server error"}',
+    status_code=500,
+    media_type="application/json",
+)
+
+
+def _cors_headers(origin: bytes, vary: bool) -> tuple[HeaderList, HeaderList]:
+    """
+    Build the preflight and simple response CORS headers for an origin
+
+    Args:
+        origin: Value of the allowed origin header
+        vary: Whether the response depends on the request origin
+
+    Returns:
+        tuple: Preflight response headers and simple response headers
+    """
+    simple_headers = [(b"access-control-allow-origin", origin)]
+    if vary:
+        simple_headers.append((b"vary", b"Origin"))
+    return [*simple_headers, *_PREFLIGHT_HEADERS], simple_headers
+
+
+class ContextMiddleware:
     """
     Create server context and bind it to the request.
     Also bind request context variables to the logger.
 
+    Implemented as a plain ASGI middleware, so requests do not pay for the
+    extra tasks and streams BaseHTTPMiddleware sets up around each call.
+    The context is stored in the scope state and read as request.state.context.
+
     Args:
-        request: FastAPI request object
-        call_next: Next middleware in chain
+        app: Next ASGI application in chain
+    """
 
-    Returns:
-        Response: FastAPI response object
-    """
-    # Generate request ID
-    request_id = uuid.uuid4().hex
-
-    # Create context
-    server_context = Context(
-        logger=request.app.logger,
-        request_id=request_id,
-        chat_agent=request.app.chat_agent,
-    )
-
-    # Bind vars to structlog logger
-    structlog.contextvars.clear_contextvars()
-    structlog.contextvars.bind_contextvars(
-        url=str(request.url),
-        method=request.method,
-        request_id=request_id,
-        client_host=request.client.host if request.client else None,
-    )
-
-    # Bind context to request state
-    request.state.context = server_context
-
-    # Process API call
-    return await call_next(request)
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(
+        self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Generate request ID
+        request_id = secrets.token_hex(8)
+
+        # Create context
+        app = scope["app"]
+        server_context = Context(
+            logger=app.logger,
+            request_id=request_id,
+            chat_agent=app.chat_agent,
+        )
+
+        # Bind vars to structlog logger
+        client = scope.get("client")
+        structlog.contextvars.clear_contextvars()
+        structlog.contextvars.bind_contextvars(
+            url=str(URL(scope=scope)),
+            method=scope["method"],
+            request_id=request_id,
+            client_host=client[0] if client else None,
+        )
+
+        # Bind context to request state
+        scope.setdefault("state", {})["context"] = server_context
+        request_logger.set(server_context.logger)
+
+        # Process API call
+        await self.app(scope, receive, send)
+
+
+class StaticCORS:
+    """
+    Allow cross-origin requests from the given origins, with any method and
+    headers.
+
+    Since the policy is fixed, all headers are computed once. With the "*"
+    wildcard no origin matching is done at all. Otherwise the request origin
+    is looked up in the allowlist and echoed back with a Vary header, and
+    requests from other origins get no CORS headers. Preflight requests from
+    allowed origins are answered directly. Credentials are not allowed.
+
+    Args:
+        app: Next ASGI application in chain
+        allow_origins: Allowed origins, or "*" to allow any origin
+    """
+
+    def __init__(
+        self, app: ASGIApp, allow_origins: Sequence[str] = ("*",)
+    ) -> None:
+        self.app = app
+
+        # Preflight and simple response headers, for any origin or by origin
+        self._any_origin_headers: tuple[HeaderList, HeaderList] | None = None
+        self._origin_headers: dict[bytes, tuple[HeaderList, HeaderList]] = {}
+        if "*" in allow_origins:
+            self._any_origin_headers = _cors_headers(b"*", vary=False)
+        else:
+            for origin in allow_origins:
+                value = origin.encode("latin-1")
+                self._origin_headers[value] = _cors_headers(value, vary=True)
+
+    async def __call__(
+        self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        cors_headers = self._any_origin_headers
+        if cors_headers is None:
+            origin = next(
+                (
+                    value
+                    for name, value in scope["headers"]
+                    if name == b"origin"
+                ),
+                None,
+            )
+            cors_headers = self._origin_headers.get(origin) if origin else None
+            if cors_headers is None:
+                await self.app(scope, receive, send)
+                return
+        preflight_headers, simple_headers = cors_headers
+
+        if scope["method"] == "OPTIONS" and any(
+            name == b"access-control-request-method"
+            for name, _ in scope["headers"]
+        ):
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 204,
+                    "headers": preflight_headers,
+                }
+            )
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_cors(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    *simple_headers,
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+
+class ErrorLogger:
+    """
+    Handle unhandled exceptions globally.
+    Logs the error and responds with an internal server error.
+
+    Replaces a catch-all exception handler on the app, which made Starlette
+    route every error through its handler lookup and rebuild the request.
+
+    Args:
+        app: Next ASGI application in chain
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(
+        self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_tracking_start(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_tracking_start)
+        except Exception as exc:
+            # Log the error
+            logger = request_logger.get(scope["app"].logger)
+            await logger.error("Unhandled exception", exc_info=exc)
+
+            # Too late to replace a response that is already being sent
+            if response_started:
+                raise
+
+            await _INTERNAL_ERROR_RESPONSE(scope, receive, send)
@@ -1,26 +1,114 @@
 import os
+import sys
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
+from dataclasses import dataclass
 
+import httpx
 import structlog
 from dotenv import load_dotenv
-from fastapi import FastAPI, Request
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from starlette.middleware import Middleware
 
 from lib.core.cal_client import CalClient
 from lib.core.chat_agent import ChatAgent
 from lib.core.logger import initialize_logger
 from lib.core.openai_client import OpenAIClient
-from lib.rest_server.middlewares import create_context
+from lib.rest_server.middlewares import (
+    ContextMiddleware,
+    ErrorLogger,
+    StaticCORS,
+)
 from rest_server.import_routes import import_routes
 
+load_dotenv()
+
+
+def _env(name: str, default: str) -> str:
+    """
+    Read an environment variable, falling back to default if unset or empty
+
+    Args:
+        name: Name of the environment variable
+        default: Value used when the variable is unset or empty
+
+    Returns:
+        str: Value of the environment variable
+    """
+    value = os.environ.get(name)
+    return value if value else default
+
+
+def _parse_int_env(name: str, default: int) -> int:
+    """
+    Read an integer environment variable, exiting if it is malformed
+
+    Runs at import, so bad configuration stops the server before any worker
+    is started rather than failing each worker during startup.
+
+    Args:
+        name: Name of the environment variable
+        default: Value used when the variable is unset or empty
+
+    Returns:
+        int: Value of the environment variable
+    """
+    value = os.environ.get(name)
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        sys.stderr.write(f"Invalid integer for {name}: {value!r}\n")
+        sys.exit(2)
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    """
+    Settings class represents the server configuration read from environment
+
+    Attributes:
+        env: Deployment environment, API docs are disabled in "prod"
+        openai_base_url: Base URL of the OpenAI API
+        openai_api_key: OpenAI API key
+        cal_base_url: Base URL of the Cal.com API
+        cal_api_key: Cal.com API key
+        cal_event_type_id: Cal.com event type ID used for new bookings
+        cors_allowed_origins: Origins allowed to call the API, or "*"
+    """
+
+    env: str
+    openai_base_url: str
+    openai_api_key: str
+    cal_base_url: str
+    cal_api_key: str
+    cal_event_type_id: int
+    cors_allowed_origins: tuple[str, ...]
+
+
+# Parsed once at import, before server workers are forked
+SETTINGS = Settings(
+    env=_env("ENV", "dev"),
+    openai_base_url=_env("OPENAI_BASE_URL", "https://api.openai.com/v1"),
+    openai_api_key=_env("OPENAI_API_KEY", ""),
+    cal_base_url=_env("CAL_BASE_URL", "https://api.cal.com/v2"),
+    cal_api_key=_env("CAL_API_KEY", ""),
+    cal_event_type_id=_parse_int_env("CAL_EVENT_TYPE_ID", 1),
+    cors_allowed_origins=tuple(
+        origin.strip()
+        for origin in _env("CORS_ALLOWED_ORIGINS", "*").split(",")
+        if origin.strip()
+    ),
+)
+
 
 class CustomFastAPI(FastAPI):
     """Extended FastAPI class with custom attributes"""
 
-    logger: structlog.BoundLogger
+    logger: structlog.stdlib.AsyncBoundLogger
     chat_agent: ChatAgent
 
 
@@ -33,22 +121,23 @@ async def lifespan(app: CustomFastAPI) -> AsyncGenerator[None, None]:
     Args:
         app: CustomFastAPI application
     """
-    load_dotenv()
-
-    openai_base_url = (
-        os.getenv("OPENAI_BASE_URL") or "https://api.openai.com/v1"
-    )
-    cal_base_url = os.getenv("CAL_BASE_URL") or "https://api.cal.com/v2"
-
     # Startup
+    # One connection pool shared by all upstream API clients
+    http_client = httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=200, max_keepalive_connections=100),
+        timeout=httpx.Timeout(30.0, connect=5.0),
+    )
     openai_client = OpenAIClient(
-        base_url=openai_base_url,
-        api_key=os.getenv("OPENAI_API_KEY") or "",
+        base_url=SETTINGS.openai_base_url,
+        api_key=SETTINGS.openai_api_key,
+        http_client=http_client,
     )
     cal_client = CalClient(
-        base_url=cal_base_url,
-        api_key=os.getenv("CAL_API_KEY") or "",
-        default_event_type_id=int(os.getenv("CAL_EVENT_TYPE_ID") or 1),
+        base_url=SETTINGS.cal_base_url,
+        api_key=SETTINGS.cal_api_key,
+        default_event_type_id=SETTINGS.cal_event_type_id,
+        http_client=http_client,
     )
     app.chat_agent = ChatAgent(
         openai_client=openai_client,
@@ -56,57 +145,43 @@ async def lifespan(app: CustomFastAPI) -> AsyncGenerator[None, None]:
     )
 
     # Initialize logger
-    initialize_logger("rest_server")
-    app.logger = structlog.get_logger("rest_server")
+    log_listener = initialize_logger("rest_server")
+    # Bind once so requests use the assembled logger directly instead of
+    # going through the lazy proxy on every call
+    app.logger = structlog.get_logger("rest_server").bind()
     await app.logger.info("Server starting up")
 
-    # Import routers
-    import_routes(app)
-
     yield  # Server is running
 
     # Shutdown
     await app.logger.info("Server shutting down")
+    await http_client.aclose()
+    log_listener.stop()
 
 
-# Create fastAPI app
-server = CustomFastAPI(lifespan=lifespan)
-
-# Add middlewares
-origins = ["*"]
-server.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Add context middleware
-server.add_middleware(BaseHTTPMiddleware, dispatch=create_context)
-
+# API docs are not served in production, so their routes and schema are
+# never built there
+_DOCS_ENABLED = SETTINGS.env != "prod"
 
-@server.exception_handler(Exception)  # type: ignore[misc]
-async def general_exception_handler(
-    request: Request,
-    exc: Exception,
-) -> JSONResponse:
-    """
-    Handle unhandled exceptions globally
+# Middlewares, the first one is the outermost
+middleware = [
+    Middleware(StaticCORS, allow_origins=SETTINGS.cors_allowed_origins),
+    # Inside CORS, so compressed responses still get CORS headers
+    Middleware(GZipMiddleware, minimum_size=1024, compresslevel=5),
+    Middleware(ErrorLogger),
+    Middleware(ContextMiddleware),
+]
 
-    Args:
-        request: FastAPI request object
-        exc: Unhandled exception
+# Create fastAPI app
+server = CustomFastAPI(
+    lifespan=lifespan,
+    middleware=middleware,
+    default_response_class=ORJSONResponse,
+    openapi_url="/openapi.json" if _DOCS_ENABLED else None,
+    docs_url="/docs" if _DOCS_ENABLED else None,
+    redoc_url="/redoc" if _DOCS_ENABLED else None,
+    swagger_ui_oauth2_redirect_url=None,
+)
 
-    Returns:
-        JSONResponse: Internal server error response
-    """
-    # Log the error
-    await request.state.context.logger.error(
-        "Unhandled exception",
-        exc_info=exc,
-    )
-    return JSONResponse(
-        status_code=500,
-        content={"error": "Internal server error"},
-    )
+# Import routers once at import, so they are built before workers are forked
+import_routes(server)